@@ -2,58 +2,122 @@
 # uv init
 # uv add beautifulsoup4
 # uv add markdownify
+# uv add orjson
+# uv add lxml
+# uv add ijson
 # uv pip install ruff
 
 import json
-import base64
+import binascii
+import functools
+import ijson
+import orjson
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import os
 import re
-from urllib.parse import urlparse, parse_qs
+import sys
+import time
+from urllib.parse import unquote_plus
 from markdownify import markdownify as md
-from bs4 import BeautifulSoup
+from lxml import etree
 
 HAR_FILE = 'myactivity.google.com.har'
 OUTPUT_JSON_FILE = 'recovered_gemini.json'
 OUTPUT_DIR = 'recovered_sessions'
+PROGRESS_INTERVAL_SEC = 0.5
+
+# Length indicator that precedes each JSON chunk in batchexecute responses
+LENGTH_PREFIX_RE = re.compile(rb'[0-9]+\s*(?=[\["{])')
+# Length line separating the following chunks
+FRAME_LENGTH_RE = re.compile(rb'\n[0-9]+\n')
+# First non-whitespace character, where the next decoded fragment starts
+FRAGMENT_START_RE = re.compile(r'\S')
+# Same characters as bytes.isspace()
+WHITESPACE = b' \t\n\r\x0b\x0c'
+# Start of the data array passed to AF_initDataCallback({key: ..., data: [...], sideChannel: {}});
+AF_DATA_START_RE = re.compile(r'AF_initDataCallback\(.*?\bdata\s*:\s*(?=\[)', re.DOTALL)
+# Same data array, searched within a single script body by the fallback parser
+SCRIPT_DATA_RE = re.compile(r'data\s*:\s*(\[.*)', re.DOTALL)
+# First f.sid query parameter (the Gemini session ID) in a request URL
+SID_RE = re.compile(r'[?&]f\.sid=([^&#]+)')
+# Digit run long enough to be an integer outside the 64-bit range orjson handles exactly
+LONG_INT_RE = re.compile(r'[0-9]{19,}')
+# Start of every line, where the Markdown quote marker is inserted
+LINE_START_RE = re.compile(r'(?m)^')
+# Size of the pieces an HTML page is fed to the pull parser in
+HTML_FEED_CHUNK_SIZE = 1 << 20
+# Shared decoder for the raw_decode fallbacks; it holds no per-call state
+JSON_DECODER = json.JSONDecoder()
 
 def strip_json_prefix(text):
-    """Strips the common Google JSON prefix `)]}'` and length indicator from a string."""
-    if text.startswith(")]}'"):
+    """Strips the common Google JSON prefix `)]}'` and length indicator from raw bytes."""
+    if text.startswith(b")]}'"):
         text = text[4:]
 
-    text = text.strip()
-    match = re.search(r'^[0-9]+\s*([["{])', text)
-    if match:
-        return text[match.start(1):]
-    return text
+    # Skip leading whitespace by index instead of copying the whole body with strip()
+    pos = 0
+    while pos < len(text) and text[pos] in WHITESPACE:
+        pos += 1
+
+    # Most bodies start with the JSON itself; only a leading digit can be a length indicator
+    if text[pos:pos + 1].isdigit():
+        match = LENGTH_PREFIX_RE.match(text, pos)
+        if match:
+            pos = match.end()
+    return text[pos:]
 
 def decode_har_entry_content(content):
-    """Decodes content from a HAR entry, handling base64 if specified."""
-    if content.get('encoding') == 'base64' and content.get('text'):
+    """
+    Returns a HAR entry's content: bytes if it is base64-encoded, else the text as is.
+    Conversion is left to the parsers, so each body is converted at most once, to the
+    type its parser works on, and irrelevant entries never pay for it.
+    """
+    text = content.get('text')
+    if not text:
+        return None
+    if content.get('encoding') == 'base64':
         try:
-            return base64.b64decode(content['text']).decode('utf-8', errors='ignore')
-        except Exception:
+            return binascii.a2b_base64(text)
+        except (binascii.Error, ValueError):
             return None
-    return content.get('text')
+    return text
 
-def extract_timestamp(record_list):
-    """Scans a record list for a likely timestamp (microseconds)."""
-    for item in record_list:
-        if isinstance(item, int):
-            if item > 1_600_000_000_000_000:
-                return datetime.fromtimestamp(item / 1_000_000)
-            elif item > 1_600_000_000_000:
-                return datetime.fromtimestamp(item / 1_000)
-    return None
+@functools.cache
+def format_timestamp(timestamp_us):
+    """Converts microseconds since the epoch to a local ISO 8601 string (memoized)."""
+    return datetime.fromtimestamp(timestamp_us / 1_000_000).isoformat()
+
+def display_date(iso_date):
+    """
+    Formats an ISO 8601 string from format_timestamp as 'YYYY-MM-DD HH:MM:SS'.
+    isoformat() output is fixed-width, so slicing avoids parsing the date again.
+    """
+    return f"{iso_date[:10]} {iso_date[11:19]}"
 
-def extract_prompt(record_list):
-    """Scans a record list for the user prompt."""
+def extract_fields(record_list):
+    """
+    Scans a record list for the user prompt and a likely timestamp in a single pass.
+    The timestamp is returned as integer microseconds. Also collects the nested lists,
+    so the caller can descend into them without walking the same list again when it
+    is not a record.
+    """
+    prompt = None
+    timestamp = None
+    children = []
     for item in record_list:
-        if isinstance(item, list) and len(item) >= 3:
-            if item[2] == "Prompted" and isinstance(item[0], str):
-                return item[0]
-    return None
+        if isinstance(item, list):
+            if prompt is None and len(item) >= 3 and item[2] == "Prompted" and isinstance(item[0], str):
+                prompt = item[0]
+            children.append(item)
+        elif timestamp is None and type(item) is int and item > 1_600_000_000_000:
+            # Exact type check: bools never count; microseconds, else milliseconds
+            timestamp = item if item > 1_600_000_000_000_000 else item * 1_000
+        else:
+            continue
+        if prompt and timestamp is not None:
+            break
+    return prompt, timestamp, children
 
 def extract_response(record_list):
     """
@@ -63,119 +127,300 @@ def extract_response(record_list):
     """
     # Iterate backwards as response is usually towards the end
     for item in reversed(record_list):
-        if isinstance(item, list):
+        if type(item) is list:
             # The response structure seems to be: [ [ [null, "HTML", ...] ] ]
-            # Let's traverse down
+            # Index straight down and let the exceptions reject other shapes
             try:
-                if len(item) > 0 and isinstance(item[0], list):
-                    nested1 = item[0]
-                    if len(nested1) > 0 and isinstance(nested1[0], list):
-                        nested2 = nested1[0]
-                        # Check for HTML content in the second element (index 1)
-                        if len(nested2) > 1 and isinstance(nested2[1], str) and "<" in nested2[1]:
-                             return nested2[1]
-            except (IndexError, TypeError):
+                nested = item[0][0]
+                if type(nested) is list:
+                    # Check for HTML content in the second element (index 1)
+                    html = nested[1]
+                    if type(html) is str and "<" in html:
+                        return html
+            except (IndexError, KeyError, TypeError):
                 pass
     return None
 
-def process_inner_payload(payload_json, recovered_records, metadata):
-    """Traverses the inner decoded JSON payload to find chat records."""
+def process_inner_payload(payload_json, recovered_records, seen, metadata):
+    """Walks the inner decoded JSON payload to find chat records."""
     if not isinstance(payload_json, list):
         return
 
-    # Check if THIS item is a record
-    prompt = extract_prompt(payload_json)
-    if prompt:
-        timestamp = extract_timestamp(payload_json)
-        response_html = extract_response(payload_json)
-
-        if timestamp:
-            record = {
-                "date": timestamp.isoformat(),
-                "prompt": prompt.strip(),
-                "response": md(response_html).strip() if response_html else None,
-                "metadata": metadata
-            }
-            # Capture IDs (just strings, no decoding needed for recovery)
-            if len(payload_json) > 5: record['id_a'] = str(payload_json[5])
-            if len(payload_json) > 6: record['id_b'] = str(payload_json[6])
-
-            # Efficient deduplication check
-            is_duplicate = False
-            for r in recovered_records:
-                if r['date'] == record['date'] and r['prompt'] == record['prompt']:
-                    is_duplicate = True
-                    break
+    # Explicit stack instead of recursion: no frame per node and no recursion limit
+    stack = [payload_json]
+    while stack:
+        node = stack.pop()
+
+        # Check if THIS item is a record
+        prompt, timestamp, children = extract_fields(node)
+        if prompt:
+            if timestamp:
+                date = format_timestamp(timestamp)
+                prompt = prompt.strip()
+
+                # Hash-based deduplication, checked before the costly response conversion
+                key = (date, prompt)
+                if key not in seen:
+                    seen.add(key)
+                    response_html = extract_response(node)
+                    # The response stays raw HTML here; parse_har_file converts it to
+                    # Markdown once all entries have been deduplicated
+                    record = {
+                        "date": date,
+                        "prompt": prompt,
+                        "response": response_html,
+                        "metadata": metadata,
+                        # Numeric sort key (microseconds); analyze_sessions removes it
+                        "_ts": timestamp
+                    }
+                    # Capture IDs (just strings, no decoding needed for recovery)
+                    if len(node) > 5: record['id_a'] = str(node[5])
+                    if len(node) > 6: record['id_b'] = str(node[6])
+                    recovered_records.append(record)
+
+            # Don't descend into the record itself if we found it (optimization)
+            continue
 
-            if not is_duplicate:
-                recovered_records.append(record)
+        # Otherwise descend; push in reverse so children are visited in order
+        stack.extend(reversed(children))
 
-        # Don't recurse into the record itself if we found it (optimization)
+def loads_inner_payload(text):
+    """
+    Decodes a stringified inner payload, with orjson whenever it gives the same result.
+    orjson turns integers beyond 64 bits into floats and rejects lone surrogate escapes;
+    the stdlib decoder keeps both, so it takes those payloads instead.
+    """
+    if not LONG_INT_RE.search(text):
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+def scan_for_nested_data(data, recovered_records, seen, metadata):
+    """Scans JSON data for strings that look like nested JSON arrays."""
+    stack = [data] if isinstance(data, (list, dict)) else []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            # Only strings held directly in lists are pushed. Test the ends in place,
+            # and strip only strings that actually start or end with whitespace
+            if node[:2] != '[[' or node[-1:] != ']':
+                if not node or not (node[0].isspace() or node[-1].isspace()):
+                    continue
+                stripped = node.strip()
+                if not (stripped.startswith('[[') and stripped.endswith(']')):
+                    continue
+            try:
+                inner_json = loads_inner_payload(node)
+                process_inner_payload(inner_json, recovered_records, seen, metadata)
+            except (json.JSONDecodeError, TypeError):
+                pass
+        elif isinstance(node, list):
+            # Scalars can hold neither strings nor containers; don't push and re-pop them
+            stack.extend([item for item in reversed(node) if isinstance(item, (str, list, dict))])
+        elif isinstance(node, dict):
+            stack.extend(value for value in reversed(node.values()) if isinstance(value, (list, dict)))
+
+def extract_json_from_html(html_text, recovered_records, seen, metadata):
+    """Extracts JSON data embedded in AF_initDataCallback calls, straight from the page text."""
+    # Scan the raw text first so pages without embedded data, or without any
+    # prompt record in it, never get parsed
+    if "Prompted" not in html_text or "AF_initDataCallback" not in html_text:
         return
 
-    # Otherwise recurse
-    for item in payload_json:
-        process_inner_payload(item, recovered_records, metadata)
-
-def scan_for_nested_data(data, recovered_records, metadata):
-    """Recursively scans JSON data for strings that look like nested JSON arrays."""
-    if isinstance(data, list):
-        for item in data:
-            if isinstance(item, str):
-                if item.strip().startswith('[[') and item.strip().endswith(']'):
-                    try:
-                        inner_json = json.loads(item)
-                        process_inner_payload(inner_json, recovered_records, metadata)
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-            else:
-                scan_for_nested_data(item, recovered_records, metadata)
-    elif isinstance(data, dict):
-        for value in data.values():
-            scan_for_nested_data(value, recovered_records, metadata)
-
-def extract_json_from_html(html_content, recovered_records, metadata):
-    """Extracts JSON data embedded in AF_initDataCallback script tags."""
+    match = AF_DATA_START_RE.search(html_text)
+    if not match:
+        # Unexpected markup around the callbacks: let the HTML parser find them
+        extract_json_from_scripts(html_text, recovered_records, seen, metadata)
+        return
+
+    try:
+        # The regex only locates each array; raw_decode finds where it really ends,
+        # whatever follows it, and the next search resumes from there
+        while match:
+            try:
+                obj, pos = JSON_DECODER.raw_decode(html_text, match.end())
+            except json.JSONDecodeError:
+                match = AF_DATA_START_RE.search(html_text, match.end())
+                continue
+            # CRITICAL FIX: The data in HTML is ALREADY a JSON object (list),
+            # not a stringified JSON like in batchexecute.
+            # So we must call process_inner_payload directly, not scan_for_nested_data.
+            process_inner_payload(obj, recovered_records, seen, metadata)
+            match = AF_DATA_START_RE.search(html_text, pos)
+    except Exception:
+        pass
+
+def extract_scripts_data(parser, recovered_records, seen, metadata):
+    """Searches the <script> elements the pull parser has closed so far, then releases them."""
+    for _, script in parser.read_events():
+        script_text = script.text
+        if script_text and "AF_initDataCallback" in script_text:
+            # Use regex to find the start of the data array
+            # Pattern: data: [...]
+            match = SCRIPT_DATA_RE.search(script_text)
+            if match:
+                json_candidate = match.group(1)
+                try:
+                    obj, _ = JSON_DECODER.raw_decode(json_candidate)
+                    process_inner_payload(obj, recovered_records, seen, metadata)
+                except json.JSONDecodeError:
+                    pass
+        script.clear()
+
+def extract_json_from_scripts(html_text, recovered_records, seen, metadata):
+    """Fallback for extract_json_from_html: parses the <script> tags and searches each one."""
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        for script in soup.find_all('script'):
-            if script.string and "AF_initDataCallback" in script.string:
-                # Use regex to find the start of the data array
-                # Pattern: data: [...]
-                match = re.search(r'data\s*:\s*(\[.*)', script.string, re.DOTALL)
-                if match:
-                    json_candidate = match.group(1)
-                    try:
-                        decoder = json.JSONDecoder()
-                        obj, _ = decoder.raw_decode(json_candidate)
-                        # CRITICAL FIX: The data in HTML is ALREADY a JSON object (list),
-                        # not a stringified JSON like in batchexecute.
-                        # So we must call process_inner_payload directly, not scan_for_nested_data.
-                        process_inner_payload(obj, recovered_records, metadata)
-                    except json.JSONDecodeError:
-                        pass
+        # lxml's pull parser reports each closed <script> element without building
+        # a BeautifulSoup tree. The page is fed in chunks and the events drained after
+        # each one, so scripts are released while the rest is still being parsed.
+        # huge_tree lifts libxml2's 10 MB text node limit; page-load scripts exceed it.
+        # Each chunk is encoded on its own: lxml refuses str holding lone surrogates,
+        # which errors='ignore' drops, and this rare path only copies a chunk at a time.
+        parser = etree.HTMLPullParser(events=('end',), tag='script', huge_tree=True, encoding='utf-8')
+        for start in range(0, len(html_text), HTML_FEED_CHUNK_SIZE):
+            parser.feed(html_text[start:start + HTML_FEED_CHUNK_SIZE].encode('utf-8', errors='ignore'))
+            extract_scripts_data(parser, recovered_records, seen, metadata)
+        parser.close()
+        extract_scripts_data(parser, recovered_records, seen, metadata)
     except Exception:
         pass
 
+def stream_har_entries(har_file_path):
+    """Yields HAR entries one at a time instead of loading the whole file into memory."""
+    with open(har_file_path, 'rb') as f:
+        try:
+            yield from ijson.items(f, 'log.entries.item', use_float=True)
+        except ijson.JSONError as e:
+            # Keep whatever was recovered before the damaged part of the file
+            print(f"Error decoding HAR file '{har_file_path}': {e}")
+
+def convert_response(response_html):
+    """Converts a model response from HTML to Markdown."""
+    return md(response_html).strip()
+
+def get_response_kind(entry):
+    """Classifies an entry by MIME type: 'json' (batchexecute), 'html' (initial page load) or None."""
+    content = (entry.get('response') or {}).get('content') or {}
+    mime_type = content.get('mimeType')
+    # A malformed entry (e.g. a null mimeType) is dropped, not allowed to abort the run
+    if not isinstance(mime_type, str):
+        return None
+    if 'application/json' in mime_type or 'text/javascript' in mime_type:
+        return 'json'
+    if 'text/html' in mime_type:
+        return 'html'
+    return None
+
+def select_entries(entries, stats):
+    """
+    Yields (index, entry) pairs for entries that can hold chat data.
+    Images, fonts, stylesheets etc. are dropped here, before their bodies are decoded
+    or sent to a worker process.
+    """
+    for i, entry in enumerate(entries):
+        stats["har_entry_count"] += 1
+        if get_response_kind(entry):
+            yield i, entry
+
+def process_entry(indexed_entry):
+    """
+    Extracts chat records from a single (index, entry) pair.
+    Returns the kind of response ('json', 'html', or None if skipped) and the records found.
+    Entries are independent, so this runs in worker processes.
+    """
+    i, entry = indexed_entry
+    records = []
+    kind = get_response_kind(entry)
+    if not kind:
+        return None, records
+
+    seen = set()
+    url = entry.get('request', {}).get('url', '')
+    content = entry.get('response', {}).get('content', {})
+    raw_content = decode_har_entry_content(content)
+
+    if not raw_content:
+        return None, records
+
+    # Extract Session ID from URL
+    sid_match = SID_RE.search(url)
+    session_id = unquote_plus(sid_match.group(1)) if sid_match else None
+
+    metadata = {
+        "entry_index": i,
+        "session_id": session_id
+    }
+
+    # Handle JSON Responses (batchexecute)
+    if kind == 'json':
+        # The framing split and orjson work on bytes; encode plain-text bodies once
+        if isinstance(raw_content, str):
+            raw_content = raw_content.encode('utf-8', errors='ignore')
+        stripped_content = strip_json_prefix(raw_content)
+        if not stripped_content:
+            return None, records
+
+        # Every record carries the "Prompted" signature; a plain substring search
+        # rejects telemetry and metadata responses far faster than parsing them
+        if b"Prompted" not in stripped_content:
+            return 'json', records
+
+        try:
+            # Streamed batchexecute responses concatenate several documents, each
+            # preceded by a length line. JSON strings cannot hold raw newlines, so
+            # splitting on those lines is safe and the length values need not be trusted.
+            documents = [orjson.loads(chunk) for chunk in FRAME_LENGTH_RE.split(stripped_content)]
+        except orjson.JSONDecodeError:
+            # Unexpected framing: read the documents one at a time instead
+            documents = []
+            stripped_text = stripped_content.decode('utf-8', errors='ignore')
+            pos = 0
+            while True:
+                # One regex search finds the next fragment instead of stepping over whitespace in Python
+                match = FRAGMENT_START_RE.search(stripped_text, pos)
+                if not match: break
+                try:
+                    json_data, pos = JSON_DECODER.raw_decode(stripped_text, match.start())
+                except json.JSONDecodeError:
+                    break
+                documents.append(json_data)
+
+        for json_data in documents:
+            scan_for_nested_data(json_data, records, seen, metadata)
+        return 'json', records
+
+    # Handle HTML Responses (Initial Page Load)
+    # The HTML path works on text; only base64 bodies need decoding
+    if isinstance(raw_content, bytes):
+        raw_content = raw_content.decode('utf-8', errors='ignore')
+    extract_json_from_html(raw_content, records, seen, metadata)
+    return 'html', records
+
+def intern_record_ids(record):
+    """
+    Interns the IDs of a record received from a worker.
+    Unpickling gives every record its own copies of these strings, which repeat
+    across many records and entries; interning keeps a single copy of each.
+    """
+    metadata = record['metadata']
+    if metadata['session_id']:
+        metadata['session_id'] = sys.intern(metadata['session_id'])
+    if 'id_a' in record: record['id_a'] = sys.intern(record['id_a'])
+    if 'id_b' in record: record['id_b'] = sys.intern(record['id_b'])
+
 def parse_har_file(har_file_path):
     """Parses the HAR file to extract Gemini chat records."""
-    recovered_records = []
-
     if not os.path.exists(har_file_path):
         print(f"Error: HAR file not found at '{har_file_path}'")
         return []
 
-    with open(har_file_path, 'r', encoding='utf-8') as f:
-        try:
-            har_data = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding HAR file '{har_file_path}': {e}")
-            return []
-
-    entries = har_data.get('log', {}).get('entries', [])
-    print(f"Found {len(entries)} HAR entries. Processing...")
+    print(f"Streaming HAR entries from '{har_file_path}'. Processing...")
 
     stats = {
+        "har_entry_count": 0,
+        "candidate_count": 0,
         "html_entry_count": 0,
         "html_records": 0,
         "json_entry_count": 0,
@@ -183,69 +428,62 @@ def parse_har_file(har_file_path):
         "json_valid_requests": 0
     }
 
-    for i, entry in enumerate(entries):
-        request = entry.get('request', {})
-        url = request.get('url', '')
-        content = entry.get('response', {}).get('content', {})
-        mime_type = content.get('mimeType', '')
-        text_content = decode_har_entry_content(content)
-
-        if not text_content:
-            continue
-
-        # Extract Session ID from URL
-        session_id = None
-        parsed_url = urlparse(url)
-        query_params = parse_qs(parsed_url.query)
-        if 'f.sid' in query_params:
-            session_id = query_params['f.sid'][0]
-
-        metadata = {
-            "entry_index": i,
-            "session_id": session_id
-        }
-
-        start_count = len(recovered_records)
-
-        # Handle JSON Responses (batchexecute)
-        if 'application/json' in mime_type or 'text/javascript' in mime_type:
-            stripped_text = strip_json_prefix(text_content)
-            if stripped_text:
+    # Records keyed by (date, prompt); entries overlap, so keep the first occurrence
+    unique_records = {}
+
+    # map() would otherwise submit every entry up front, reading the whole HAR into
+    # memory ahead of the workers; buffersize (Python 3.14+) caps the chunks in flight
+    workers = os.process_cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        entries = select_entries(stream_har_entries(har_file_path), stats)
+        results = executor.map(process_entry, entries, chunksize=64, buffersize=2 * workers)
+        last_progress = time.monotonic()
+        for kind, records in results:
+            stats["candidate_count"] += 1
+
+            count = 0
+            for record in records:
+                key = (record['date'], record['prompt'])
+                if key not in unique_records:
+                    intern_record_ids(record)
+                    unique_records[key] = record
+                    count += 1
+
+            if kind == 'json':
                 stats["json_entry_count"] += 1
-                decoder = json.JSONDecoder()
-                pos = 0
-                while pos < len(stripped_text):
-                    try:
-                        while pos < len(stripped_text) and stripped_text[pos].isspace():
-                            pos += 1
-                        if pos >= len(stripped_text): break
-                        json_data, index = decoder.raw_decode(stripped_text, pos)
-                        pos = index
-                        scan_for_nested_data(json_data, recovered_records, metadata)
-                    except json.JSONDecodeError:
-                        break
-                
-                count = len(recovered_records) - start_count
                 stats["json_records"] += count
                 if count > 0:
                     stats["json_valid_requests"] += 1
-        
-        # Handle HTML Responses (Initial Page Load)
-        elif 'text/html' in mime_type:
-            stats["html_entry_count"] += 1
-            extract_json_from_html(text_content, recovered_records, metadata)
-            count = len(recovered_records) - start_count
-            stats["html_records"] += count
-
-        if (i + 1) % 20 == 0:
-            print(f"Processed {i + 1}/{len(entries)} entries. Found {len(recovered_records)} records so far.")
-
-    # Sort records by date
-    recovered_records.sort(key=lambda x: x['date'])
+            elif kind == 'html':
+                stats["html_entry_count"] += 1
+                stats["html_records"] += count
+
+            # Report progress by elapsed time rather than entry count, so large HARs
+            # don't flood stdout with lines nobody can read
+            now = time.monotonic()
+            if now - last_progress >= PROGRESS_INTERVAL_SEC:
+                last_progress = now
+                print(f"Processed {stats['candidate_count']} JSON/HTML entries. Found {len(unique_records)} records so far.")
+
+        recovered_records = list(unique_records.values())
+
+        # Converting only the surviving records skips every duplicate, and the
+        # conversions themselves are spread across the same worker pool
+        answered = [record for record in recovered_records if record['response']]
+        # Identical responses (e.g. from retried requests) are converted only once
+        unique_html = list(dict.fromkeys(record['response'] for record in answered))
+        print(f"Converting {len(unique_html)} responses to Markdown...")
+        converted = dict(zip(unique_html, executor.map(convert_response, unique_html, chunksize=16)))
+        for record in answered:
+            record['response'] = converted[record['response']]
+
+    # Sort records by time, comparing the integer timestamps rather than date strings
+    recovered_records.sort(key=lambda x: x['_ts'])
 
     print("-" * 40)
     print("DATA INTEGRITY VERIFICATION")
     print("-" * 40)
+    print(f"HAR Entries: {stats['har_entry_count']} | JSON/HTML Candidates: {stats['candidate_count']}")
     print(f"HTML Requests: {stats['html_entry_count']} | Records Extracted: {stats['html_records']}")
     print(f"JSON Requests: {stats['json_entry_count']} | Valid (with data): {stats['json_valid_requests']} | Records Extracted: {stats['json_records']}")
     print(f"Total Raw Records: {len(recovered_records)}")
@@ -262,17 +500,16 @@ def parse_har_file(har_file_path):
     return recovered_records
 
 def analyze_sessions(records):
-    # Time Clustering
-    records.sort(key=lambda x: x['date'])
-
+    # Time Clustering; records come from parse_har_file already sorted by '_ts'
     sessions = []
     current_session = []
-    last_ts = 0
-    TIME_THRESHOLD_SEC = 2 * 60 * 60 # 2 hours
+    last_ts = None
+    TIME_THRESHOLD_US = 2 * 60 * 60 * 1_000_000 # 2 hours
 
     for r in records:
-        ts = datetime.fromisoformat(r['date']).timestamp()
-        if last_ts == 0 or (ts - last_ts) > TIME_THRESHOLD_SEC:
+        # The sort key is not part of the output; drop it as it is consumed
+        ts = r.pop('_ts')
+        if last_ts is None or (ts - last_ts) > TIME_THRESHOLD_US:
             if current_session: sessions.append(current_session)
             current_session = [r]
         else:
@@ -295,46 +532,50 @@ def save_to_json(sessions, output_file):
         }
         output_data.append(session_data)
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
+    # orjson serializes in C and emits UTF-8 bytes directly (no ASCII escaping)
+    with open(output_file, 'wb') as f:
+        f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
     print(f"Recovered data saved to '{output_file}'")
 
 def save_sessions_to_files(sessions, output_dir):
     """Saves each session to a separate Markdown file."""
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
 
     print(f"Saving {len(sessions)} sessions to directory '{output_dir}/'...")
 
     for i, session in enumerate(sessions):
         if not session: continue
 
-        # Get start time for filename
-        start_dt = datetime.fromisoformat(session[0]['date'])
-        filename = f"Session_{start_dt.strftime('%Y%m%d_%H%M')}.md"
+        # Get start time for filename (YYYYMMDD_HHMM)
+        start_date = display_date(session[0]['date'])
+        filename = f"Session_{start_date[:10].replace('-', '')}_{start_date[11:16].replace(':', '')}.md"
         file_path = os.path.join(output_dir, filename)
 
+        # Assemble the whole file in memory and write it once
+        parts = [
+            f"# Session {i+1}\n",
+            f"**Date:** {start_date}\n",
+            f"**Messages:** {len(session)}\n\n"
+        ]
+
+        for record in session:
+            # Use complete time format as requested
+            parts.append(f"## [{display_date(record['date'])}]\n\n")
+
+            # User Prompt
+            clean_prompt = record['prompt'].replace('\r', '')
+            quoted_prompt = LINE_START_RE.sub('> ', clean_prompt)
+            parts.append(f"**User**:\n{quoted_prompt}\n\n")
+
+            # Gemini Response
+            if record.get('response'):
+                clean_response = record['response'].replace('\r', '')
+                parts.append(f"**Gemini**:\n{clean_response}\n\n")
+
+            parts.append("---\n\n")
+
         with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(f"# Session {i+1}\n")
-            f.write(f"**Date:** {start_dt.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"**Messages:** {len(session)}\n\n")
-
-            for record in session:
-                date_obj = datetime.fromisoformat(record['date'])
-                # Use complete time format as requested
-                f.write(f"## [{date_obj.strftime('%Y-%m-%d %H:%M:%S')}]\n\n")
-
-                # User Prompt
-                clean_prompt = record['prompt'].replace('\r', '')
-                quoted_prompt = "\n".join([f"> {line}" for line in clean_prompt.split('\n')])
-                f.write(f"**User**:\n{quoted_prompt}\n\n")
-
-                # Gemini Response
-                if record.get('response'):
-                    clean_response = record['response'].replace('\r', '')
-                    f.write(f"**Gemini**:\n{clean_response}\n\n")
-
-                f.write("---\n\n")
+            f.write("".join(parts))
 
     print("All sessions saved.")
 